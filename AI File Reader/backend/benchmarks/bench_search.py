@@ -0,0 +1,100 @@
+"""
+Benchmark cross-document search as the number of indexed documents grows.
+
+Builds one collection per synthetic document (same layout as `file_{conversationId}`)
+and times `search_user_documents` for each document count. Run it against a real
+Qdrant server:
+
+    python benchmarks/bench_search.py --url http://localhost:6333 --docs 10 50 100 300
+
+Without `--url` it falls back to Qdrant's in-process local mode, which answers each
+query synchronously. That only checks the merge logic: the fan-out never overlaps,
+timeouts never trigger, and the numbers say nothing about hundreds of documents.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import AsyncQdrantClient, models
+from services.search import search_user_documents
+
+
+async def create_documents(client, count, chunks_per_doc, dim, rng):
+    documents = []
+    for i in range(count):
+        doc_id = str(uuid.uuid4())
+        collection_name = f"file_{doc_id}"
+        await client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+        )
+        await client.upsert(
+            collection_name=collection_name,
+            points=[
+                models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=[rng.random() for _ in range(dim)],
+                    payload={"page_content": f"doc {i} chunk {j}", "metadata": {}},
+                )
+                for j in range(chunks_per_doc)
+            ],
+        )
+        documents.append({"id": doc_id, "prompt": f"document_{i}.pdf"})
+    return documents
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    if args.url:
+        client = AsyncQdrantClient(url=args.url)
+    else:
+        print(
+            "WARNING: no --url given, using in-process local mode. Queries run one after another,\n"
+            "so these timings do not reflect parallel fan-out or per-index timeouts.\n",
+            file=sys.stderr,
+        )
+        client = AsyncQdrantClient(location=":memory:")
+
+    print(f"{'docs':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'partial':>8}")
+    for count in args.docs:
+        documents = await create_documents(client, count, args.chunks, args.dim, rng)
+        timings = []
+        partial = 0
+        for _ in range(args.queries):
+            query_vector = [rng.random() for _ in range(args.dim)]
+            started = time.perf_counter()
+            result = await search_user_documents(client, query_vector, documents, k=args.k)
+            timings.append((time.perf_counter() - started) * 1000)
+            partial += result["partial"]
+
+        timings.sort()
+        p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{count:>6} {statistics.median(timings):>10.1f} {p95:>10.1f} {timings[-1]:>10.1f} {partial:>8}")
+
+        for doc in documents:
+            await client.delete_collection(f"file_{doc['id']}")
+
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[1, 10, 50, 100, 300])
+    parser.add_argument("--chunks", type=int, default=50, help="chunks per document")
+    parser.add_argument("--dim", type=int, default=256, help="vector size")
+    parser.add_argument("--queries", type=int, default=20, help="queries per document count")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default=os.getenv("QDRANT_URL"), help="Qdrant server URL (default: $QDRANT_URL)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
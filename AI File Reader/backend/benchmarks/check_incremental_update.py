@@ -0,0 +1,101 @@
+"""
+Check the incremental re-indexing used by `PUT /api/ai/upload/{id}` against in-process Qdrant.
+
+Runs diff_chunks/add_chunks/delete_chunks on a collection built the way uploads build it
+and verifies that an edit adds and removes only the changed chunks, that applying or
+retrying an update is idempotent, that duplicate chunks are stored once and that a
+missing collection is rebuilt from scratch. Embeddings come from the offline hasher of
+the eval harness. Exits non-zero when any check fails.
+
+    python benchmarks/check_incremental_update.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eval_retrieval import HashingEmbeddings
+from services.ingestion import add_chunks, delete_chunks, diff_chunks, index_documents, split_text
+
+PARAGRAPHS = [
+    f"Section {i}. The retention period for archive class {i} is {i * 7} days, after which "
+    f"records are reviewed by the owning team and either renewed or deleted."
+    for i in range(10)
+]
+
+
+def document(paragraphs):
+    # One chunk per paragraph, so an edit to one paragraph changes exactly one chunk
+    return split_text("\n\n".join(paragraphs), chunk_size=200, chunk_overlap=0)
+
+
+def matches_file(client, collection_name, split_docs):
+    points, _ = client.scroll(collection_name=collection_name, limit=10_000, with_payload=True)
+    return sorted(point.payload["page_content"] for point in points) == sorted(doc.page_content for doc in split_docs)
+
+
+def apply_update(client, collection_name, split_docs, embedding):
+    new_docs, stale_ids, unchanged = diff_chunks(client, collection_name, split_docs)
+    add_chunks(client, collection_name, new_docs, embedding)
+    delete_chunks(client, collection_name, stale_ids)
+    return len(new_docs), len(stale_ids), unchanged
+
+
+def check(name, actual, expected):
+    status = "ok" if actual == expected else "FAILED"
+    print(f"{name:<45} {actual!s:<15} expected {expected!s:<15} {status}")
+    return actual == expected
+
+
+def main():
+    embedding = HashingEmbeddings()
+    results = []
+
+    original = document(PARAGRAPHS)
+    store = index_documents(original, "file_check", embedding=embedding, location=":memory:")
+    client = store.client
+    chunks = len(original)
+    changed = 1
+
+    edited_paragraphs = list(PARAGRAPHS)
+    edited_paragraphs[4] = edited_paragraphs[4].replace("28 days", "30 days")
+    edited = document(edited_paragraphs)
+
+    new, stale, unchanged = diff_chunks(client, "file_check", edited)
+    results.append(check("edit: new / stale / unchanged", (len(new), len(stale), unchanged), (changed, changed, chunks - changed)))
+
+    results.append(check("edit: apply", apply_update(client, "file_check", edited, embedding), (changed, changed, chunks - changed)))
+    results.append(check("edit: collection matches file", matches_file(client, "file_check", edited), True))
+    results.append(check("edit: re-run is a no-op", apply_update(client, "file_check", edited, embedding), (0, 0, chunks)))
+
+    # A retry after a failure between add and delete: the new chunks are already stored
+    reverted = document(PARAGRAPHS)
+    new, stale, _ = diff_chunks(client, "file_check", reverted)
+    add_chunks(client, "file_check", new, embedding)
+    add_chunks(client, "file_check", new, embedding)
+    results.append(check("retry: upsert twice keeps one copy", client.count("file_check").count, chunks + changed))
+    results.append(check("retry: remaining diff", apply_update(client, "file_check", reverted, embedding), (0, changed, chunks)))
+    results.append(check("retry: collection matches file", matches_file(client, "file_check", reverted), True))
+
+    # Uploads store every chunk with a random id, so repeated chunks are stored twice
+    repeated = document(PARAGRAPHS[:3] + PARAGRAPHS[:3])
+    unique = len({doc.page_content for doc in repeated})
+    store = index_documents(repeated, "file_duplicates", embedding=embedding, location=":memory:")
+    client = store.client
+    new, stale, unchanged = diff_chunks(client, "file_duplicates", repeated)
+    results.append(check("duplicates: new / stale / unchanged", (len(new), len(stale), unchanged), (0, len(repeated) - unique, unique)))
+    apply_update(client, "file_duplicates", repeated, embedding)
+    results.append(check("duplicates: one copy per chunk", client.count("file_duplicates").count, unique))
+    results.append(check("duplicates: re-run is a no-op", apply_update(client, "file_duplicates", repeated, embedding), (0, 0, unique)))
+
+    new, stale, unchanged = diff_chunks(client, "file_missing", edited)
+    results.append(check("missing: new / stale / unchanged", (len(new), len(stale), unchanged), (chunks, 0, 0)))
+    apply_update(client, "file_missing", edited, embedding)
+    results.append(check("missing: collection rebuilt", matches_file(client, "file_missing", edited), True))
+    results.append(check("missing: re-run is a no-op", apply_update(client, "file_missing", edited, embedding), (0, 0, chunks)))
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Offline retrieval-quality and latency evaluation for the RAG pipeline.
+
+Ingests a fixture corpus and answers labeled questions with the same extraction,
+cleaning, chunking, retrieval and prompt-building code the server uses, once per
+configuration, and prints a comparison report. Qdrant runs in-process and the LLM is
+replaced by an extractive stand-in. By default embeddings come from a deterministic
+character n-gram hasher, so the run is offline and repeatable; `--embeddings openai`
+uses the server's embedding model instead, so recall and MRR reflect real retrieval.
+
+By default every corpus file goes into one pooled collection, so each question has to
+be found among all chunks of all files, including distractor documents without
+questions. `--scope file` searches only the question's own file, as the single-file
+chat endpoint does. A question counts as answered at rank r when the r-th retrieved
+chunk comes from its file and contains its labeled passage.
+
+    python benchmarks/eval_retrieval.py
+    python benchmarks/eval_retrieval.py --embeddings openai --configs my_configs.json --output report.json
+"""
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import sys
+import time
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from services.ingestion import clean_text, get_embeddings, index_documents, prepare_text, split_text
+from services.retrieval import build_chat_prompt, build_context, embed_query, generate_answer, search
+
+load_dotenv()
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "eval"
+STAGES = ["embed_query", "search", "build_context", "build_prompt", "generate"]
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic local embeddings from hashed character n-grams."""
+
+    def __init__(self, size=512, n=4):
+        self.size = size
+        self.n = n
+
+    def _embed(self, text):
+        # clean_text joins lowercase words, so compare texts with all spacing removed
+        text = re.sub(r"[^0-9a-z]", "", text.lower())
+        vector = [0.0] * self.size
+        for i in range(max(len(text) - self.n + 1, 1)):
+            vector[zlib.crc32(text[i:i + self.n].encode()) % self.size] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class StubLLM:
+    """Stands in for the chat client: answers with the context sentence closest to the question."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        context, _, question = prompt.partition("User Question:")
+        question_words = set(re.findall(r"\w+", question.lower()))
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", context) if s.strip()]
+        answer = max(sentences, key=lambda s: len(question_words & set(re.findall(r"\w+", s.lower()))), default="")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=answer))])
+
+
+def get_token_counter():
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return (lambda text: len(encoding.encode(text))), "tiktoken cl100k_base"
+    except Exception:
+        return (lambda text: math.ceil(len(text) / 4)), "approx. chars/4"
+
+
+def normalize(text):
+    return re.sub(r"\s+", "", clean_text(text)).lower()
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def load_questions(fixtures_dir):
+    with open(fixtures_dir / "questions.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def warm_up(embedding):
+    """Load the lazily imported splitter and vector store once so the first config isn't charged for it."""
+    split_docs = split_text("warm up", chunk_size=100, chunk_overlap=0)
+    index_documents(split_docs, "file_warm_up", embedding=embedding, location=":memory:")
+
+
+def evaluate(config, fixtures_dir, questions, count_tokens, embedding, scope):
+    llm = StubLLM()
+    k = config["k"]
+
+    ingest_ms = {"split": 0.0, "index": 0.0}
+    split_by_file = {}
+    for path in sorted(fixtures_dir.glob("*.md")):
+        text = prepare_text(path.read_bytes(), path.name)
+
+        started = time.perf_counter()
+        split_docs = split_text(text, chunk_size=config["chunk_size"], chunk_overlap=config["chunk_overlap"])
+        ingest_ms["split"] += (time.perf_counter() - started) * 1000
+
+        for doc in split_docs:
+            doc.metadata["source"] = path.name
+        split_by_file[path.name] = split_docs
+
+    started = time.perf_counter()
+    if scope == "pooled":
+        pooled = [doc for docs in split_by_file.values() for doc in docs]
+        store = index_documents(pooled, "file_pooled", embedding=embedding, location=":memory:")
+        stores = {name: store for name in split_by_file}
+    else:
+        stores = {
+            name: index_documents(docs, f"file_{name}", embedding=embedding, location=":memory:")
+            for name, docs in split_by_file.items()
+        }
+    ingest_ms["index"] += (time.perf_counter() - started) * 1000
+    chunks = sum(len(docs) for docs in split_by_file.values())
+
+    latencies = {stage: [] for stage in STAGES}
+    hits = 0
+    reciprocal_ranks = []
+    context_tokens = []
+    prompt_tokens = []
+    for question in questions:
+        vector_store = stores[question["file"]]
+        timings = {}
+
+        started = time.perf_counter()
+        query_vector = embed_query(vector_store, question["question"])
+        timings["embed_query"] = time.perf_counter()
+        matches = search(vector_store, query_vector, k=k)
+        timings["search"] = time.perf_counter()
+        retrieved_context = build_context(matches)
+        timings["build_context"] = time.perf_counter()
+        prompt = build_chat_prompt(retrieved_context, question["question"])
+        timings["build_prompt"] = time.perf_counter()
+        generate_answer(llm, prompt)
+        timings["generate"] = time.perf_counter()
+
+        previous = started
+        for stage in STAGES:
+            latencies[stage].append((timings[stage] - previous) * 1000)
+            previous = timings[stage]
+
+        passage = normalize(question["passage"])
+        rank = next(
+            (
+                i + 1 for i, doc in enumerate(matches)
+                if doc.metadata.get("source") == question["file"] and passage in normalize(doc.page_content)
+            ),
+            None,
+        )
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        context_tokens.append(count_tokens(retrieved_context))
+        prompt_tokens.append(count_tokens(prompt))
+
+    total_ms = [sum(latencies[stage][i] for stage in STAGES) for i in range(len(questions))]
+    return {
+        "config": config,
+        "chunks": chunks,
+        "recall_at_k": hits / len(questions),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "context_tokens": statistics.mean(context_tokens),
+        "prompt_tokens": statistics.mean(prompt_tokens),
+        "ingest_ms": ingest_ms,
+        "latency_ms": {
+            stage: {"p50": statistics.median(samples), "p95": percentile(samples, 0.95)}
+            for stage, samples in list(latencies.items()) + [("total", total_ms)]
+        },
+    }
+
+
+def format_delta(value, baseline, fmt, lower_is_better=False):
+    if baseline is None or value == baseline:
+        return format(value, fmt)
+    better = value < baseline if lower_is_better else value > baseline
+    return f"{format(value, fmt)} ({'+' if value > baseline else ''}{format(value - baseline, fmt)}{'' if better else ' !'})"
+
+
+def print_report(results, questions, token_method, embeddings_name, scope):
+    print(
+        f"Questions: {len(questions)} | embeddings: {embeddings_name} | scope: {scope} | tokens: {token_method} | "
+        f"deltas vs '{results[0]['config']['name']}', '!' marks a regression\n"
+    )
+    header = ["config", "chunk", "overlap", "k", "chunks", "recall@k", "MRR", "ctx tokens", "p50 ms", "p95 ms"]
+    rows = []
+    base = results[0]
+    for result in results:
+        is_base = result is base
+        config = result["config"]
+        latency = result["latency_ms"]["total"]
+        rows.append([
+            config["name"],
+            str(config["chunk_size"]),
+            str(config["chunk_overlap"]),
+            str(config["k"]),
+            str(result["chunks"]),
+            format_delta(result["recall_at_k"], None if is_base else base["recall_at_k"], ".2f"),
+            format_delta(result["mrr"], None if is_base else base["mrr"], ".3f"),
+            format_delta(result["context_tokens"], None if is_base else base["context_tokens"], ".0f", lower_is_better=True),
+            format_delta(latency["p50"], None if is_base else base["latency_ms"]["total"]["p50"], ".2f", lower_is_better=True),
+            format_delta(latency["p95"], None if is_base else base["latency_ms"]["total"]["p95"], ".2f", lower_is_better=True),
+        ])
+
+    widths = [max(len(h), *(len(row[i]) for row in rows)) for i, h in enumerate(header)]
+    print("| " + " | ".join(h.ljust(w) for h, w in zip(header, widths)) + " |")
+    print("|" + "|".join("-" * (w + 2) for w in widths) + "|")
+    for row in rows:
+        print("| " + " | ".join(cell.ljust(w) for cell, w in zip(row, widths)) + " |")
+
+    print("\nPer-stage p50 latency (ms):\n")
+    print("| config | " + " | ".join(STAGES) + " | ingest split | ingest index |")
+    print("|" + "---|" * (len(STAGES) + 3))
+    for result in results:
+        stages = " | ".join(f"{result['latency_ms'][stage]['p50']:.3f}" for stage in STAGES)
+        ingest = result["ingest_ms"]
+        print(f"| {result['config']['name']} | {stages} | {ingest['split']:.1f} | {ingest['index']:.1f} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR, help="directory with the corpus and questions.jsonl")
+    parser.add_argument("--configs", type=Path, default=FIXTURES_DIR / "configs.json", help="JSON list of configurations; the first is the baseline")
+    parser.add_argument("--embeddings", choices=["hashing", "openai"], default="hashing", help="offline n-gram hasher or the server's OpenAI embedding model")
+    parser.add_argument("--scope", choices=["pooled", "file"], default="pooled", help="search all corpus files together or only the question's file")
+    parser.add_argument("--output", type=Path, help="write the full results as JSON")
+    args = parser.parse_args()
+
+    if args.embeddings == "openai":
+        if not os.getenv("OPENAI_API_KEY"):
+            sys.exit("OPENAI_API_KEY is required for --embeddings openai")
+        embedding = get_embeddings()
+    else:
+        embedding = HashingEmbeddings()
+
+    questions = load_questions(args.fixtures)
+    with open(args.configs, encoding="utf-8") as f:
+        configs = json.load(f)
+
+    count_tokens, token_method = get_token_counter()
+    warm_up(embedding)
+    results = [
+        evaluate(config, args.fixtures, questions, count_tokens, embedding, args.scope)
+        for config in configs
+    ]
+    print_report(results, questions, token_method, args.embeddings, args.scope)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "tokens": token_method,
+                "embeddings": args.embeddings,
+                "scope": args.scope,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
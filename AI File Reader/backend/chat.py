@@ -1,50 +1,66 @@
+import argparse
+import os
 from dotenv import load_dotenv
 from langchain_qdrant import QdrantVectorStore
-from langchain_openai import OpenAIEmbeddings
 from openai import OpenAI
+from services.ingestion import get_embeddings
 
 load_dotenv()
 
-client = OpenAI()
+parser = argparse.ArgumentParser(description="Chat with an indexed file from the terminal.")
+parser.add_argument("conversation_id", help="id of the creation whose file_{id} collection to query")
+parser.add_argument("--k", type=int, default=5)
+parser.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL", "http://localhost:6333"))
+args = parser.parse_args()
 
-# Vector Embeddings
-embedding_model = OpenAIEmbeddings(
-    model="text-embedding-3-large"
-)
+# Clients are built once and reused for every query
+client = OpenAI()
 
 vector_db = QdrantVectorStore.from_existing_collection(
-    url="http://localhost:6333",
-    collection_name="learning_vectors",
-    embedding=embedding_model
+    url=args.qdrant_url,
+    collection_name=f"file_{args.conversation_id}",
+    embedding=get_embeddings()
 )
 
-# Take User Query
-query = input("> ")
+while True:
+    # Take User Query
+    try:
+        query = input("> ").strip()
+    except (EOFError, KeyboardInterrupt):
+        break
+    if not query:
+        continue
+    if query in ("exit", "quit"):
+        break
 
-# Vector Similarity Search [query] in DB
-search_results = vector_db.similarity_search(
-    query=query
-)
+    try:
+        # Vector Similarity Search [query] in DB
+        search_results = vector_db.similarity_search(
+            query=query,
+            k=args.k
+        )
 
-context = "\n\n\n".join([f"Page Content: {result.page_content}\nPage Number: {result.metadata['page_label']}\nFile Location: {result.metadata['source']}" for result in search_results])
+        context = "\n\n\n".join([f"Page Content: {result.page_content}" for result in search_results])
 
-SYSTEM_PROMPT = f"""
-    You are a helpfull AI Assistant who asnweres user query based on the available context
-    retrieved from a PDF file along with page_contents and page number.
+        SYSTEM_PROMPT = f"""
+            You are a helpfull AI Assistant who asnweres user query based on the available context
+            retrieved from a file.
 
-    You should only ans the user based on the following context and navigate the user
-    to open the right page number to know more.
+            You should only ans the user based on the following context.
 
-    Context:
-    {context}
-"""
+            Context:
+            {context}
+        """
 
-chat_completion = client.chat.completions.create(
-    model="gpt-4.1",
-    messages=[
-        { "role": "system", "content": SYSTEM_PROMPT },
-        { "role": "user", "content": query },
-    ]
-)
+        chat_completion = client.chat.completions.create(
+            model="gpt-4.1",
+            messages=[
+                { "role": "system", "content": SYSTEM_PROMPT },
+                { "role": "user", "content": query },
+            ]
+        )
 
-print(f"🤖: {chat_completion.choices[0].message.content}")
\ No newline at end of file
+        print(f"🤖: {chat_completion.choices[0].message.content}")
+    except Exception as e:
+        # Keep the session alive; the next query may well succeed
+        print(f"⚠️  Error: {e}")
@@ -10,7 +10,8 @@ def get_db_connection():
             
         conn = psycopg2.connect(
             database_url,
-            cursor_factory=RealDictCursor
+            cursor_factory=RealDictCursor,
+            connect_timeout=int(os.getenv("DATABASE_CONNECT_TIMEOUT", "5"))
         )
         return conn
     except Exception as e:
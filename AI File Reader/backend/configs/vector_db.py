@@ -0,0 +1,23 @@
+import os
+
+_client = None
+_async_client = None
+
+def get_qdrant_url():
+    return os.getenv("QDRANT_URL", "http://vector-db:6333")
+
+def get_qdrant_client():
+    """Return a process-wide Qdrant client, created on first use."""
+    global _client
+    if _client is None:
+        from qdrant_client import QdrantClient
+        _client = QdrantClient(url=get_qdrant_url(), timeout=10)
+    return _client
+
+def get_async_qdrant_client():
+    """Return a process-wide async Qdrant client, created on first use."""
+    global _async_client
+    if _async_client is None:
+        from qdrant_client import AsyncQdrantClient
+        _async_client = AsyncQdrantClient(url=get_qdrant_url(), timeout=10)
+    return _async_client
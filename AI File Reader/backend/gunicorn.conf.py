@@ -0,0 +1,44 @@
+"""
+Production server: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app is imported once in the master (preload_app) together with the heavy
+libraries that main.py otherwise loads lazily, so forked workers share them
+copy-on-write and start serving without paying the import cost themselves.
+Database and client initialization still happens per worker in the app lifespan.
+"""
+import importlib
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+PRELOAD_MODULES = [
+    "openai",
+    "langchain_core.documents",
+    "langchain_text_splitters",
+    "langchain_openai",
+    "langchain_qdrant",
+    "qdrant_client",
+    "PyPDF2",
+    "docx",
+    "pptx",
+    "openpyxl",
+    "xlrd",
+]
+
+
+def on_starting(server):
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            server.log.warning(f"Could not preload {module}: {e}")
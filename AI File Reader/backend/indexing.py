@@ -1,39 +1,232 @@
-from dotenv import load_dotenv
+"""
+Bulk-index existing files with the same pipeline as `/api/ai/upload`.
+
+Each file is extracted, cleaned, chunked and embedded into its own `file_{id}` collection
+and registered in `creations`, so it shows up in the app like an uploaded file.
+Progress is appended to a checkpoint file; re-running the same command skips files that
+were already indexed. Conversation ids are derived from the file's path, owner and
+content hash, so a run interrupted between the database commit and the checkpoint
+write does not create duplicates when resumed.
+
+    python indexing.py ./docs --user-id user_123 --workers 8
+    python indexing.py manifest.jsonl --workers 8
 
+A manifest is a text file with one path per line, or JSON lines of the form
+{"path": "...", "user_id": "..."}.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
+
+from dotenv import load_dotenv
 
 load_dotenv()
 
-pdf_path = Path(__file__).parent / "nodejs.pdf"
+from configs.database import get_db_connection, init_db
+from services.ingestion import (
+    ALLOWED_EXTENSIONS,
+    delete_collection,
+    get_embeddings,
+    get_file_extension,
+    index_documents,
+    insert_creation,
+    prepare_chunks,
+)
 
-# Loading
-loader = PyPDFLoader(file_path=pdf_path)
-docs = loader.load()  # Read PDF File
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("indexing")
+logger.setLevel(logging.INFO)
 
-# Chunking
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=400
-)
 
-split_docs = text_splitter.split_documents(documents=docs)
+def load_jobs(source: Path, default_user_id: str):
+    """Return a list of (path, user_id) pairs from a directory or a manifest file."""
+    jobs = []
+    if source.is_dir():
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and get_file_extension(path.name) in ALLOWED_EXTENSIONS:
+                jobs.append((path, default_user_id))
+    else:
+        base = source.parent
+        with open(source, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                if line.startswith("{"):
+                    entry = json.loads(line)
+                    path, user_id = entry["path"], entry.get("user_id") or default_user_id
+                else:
+                    path, user_id = line, default_user_id
+                path = Path(path)
+                jobs.append((path if path.is_absolute() else base / path, user_id))
 
-# Vector Embeddings
-embedding_model = OpenAIEmbeddings(
-    model="text-embedding-3-large"
-)
+    missing_owner = [str(path) for path, user_id in jobs if not user_id]
+    if missing_owner:
+        raise ValueError(f"No user id for {len(missing_owner)} file(s), e.g. {missing_owner[0]}. Pass --user-id.")
 
-# Using [embedding_model] create embeddings of [split_docs] and store in DB
+    # Listing a file twice would give two workers the same conversation id
+    unique_jobs = {}
+    for path, user_id in jobs:
+        unique_jobs.setdefault((path.resolve(), user_id), (path, user_id))
+    return list(unique_jobs.values())
+
+
+def job_key(path: Path, user_id: str, digest: str) -> str:
+    return f"{user_id}:{path.resolve()}:{digest}"
+
+
+def load_checkpoint(checkpoint: Path):
+    done = set()
+    if checkpoint.exists():
+        with open(checkpoint, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    done.add(json.loads(line)["key"])
+    return done
+
+
+class Checkpoint:
+    """Append-only record of finished files, safe to write from worker threads."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self, key: str, conversation_id: str, chunks: int):
+        entry = json.dumps({"key": key, "conversationId": conversation_id, "chunks": chunks})
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(entry + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def ingest_file(path: Path, user_id: str, content: bytes, conversation_id: str, embeddings):
+    """
+    Index one file and register it in `creations`; returns the chunk count.
+
+    Returns None when `conversation_id` is already registered, i.e. an earlier run
+    finished this file but was interrupted before recording it in the checkpoint.
+    """
+    safe_text, split_docs = prepare_chunks(content, path.name)
+
+    # Keep the connection only for the lookup, so no transaction stays open while embedding
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT id FROM creations WHERE id = %s", (conversation_id,))
+        if cur.fetchone():
+            return None
+    finally:
+        cur.close()
+        conn.close()
+
+    collection_name = f"file_{conversation_id}"
+    # Recreate rather than append, in case an interrupted run left a partial collection
+    index_documents(split_docs, collection_name, embedding=embeddings, force_recreate=True)
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        insert_creation(cur, conversation_id, user_id, path.name, safe_text)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        try:
+            delete_collection(collection_name)
+        except Exception:
+            pass
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    return len(split_docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="directory to scan or manifest file")
+    parser.add_argument("--user-id", help="owner of the files (default for manifest entries)")
+    parser.add_argument("--workers", type=int, default=4, help="number of files indexed in parallel")
+    parser.add_argument("--checkpoint", type=Path, default=Path(".indexing_checkpoint.jsonl"))
+    args = parser.parse_args()
+
+    if not args.source.exists():
+        parser.error(f"{args.source} does not exist")
+    if args.source.is_dir() and not args.user_id:
+        parser.error("--user-id is required when indexing a directory")
+    try:
+        jobs = load_jobs(args.source, args.user_id)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not os.getenv("OPENAI_API_KEY"):
+        sys.exit("OPENAI_API_KEY is required for embeddings")
+
+    init_db()
+    done = load_checkpoint(args.checkpoint)
+    checkpoint = Checkpoint(args.checkpoint)
+    embeddings = get_embeddings()
+
+    stats = {"indexed": 0, "skipped": 0, "failed": 0, "chunks": 0, "bytes": 0}
+    started = time.perf_counter()
+
+    def run(path: Path, user_id: str):
+        content = path.read_bytes()
+        key = job_key(path, user_id, hashlib.sha256(content).hexdigest())
+        if key in done:
+            return "skipped", path, 0, len(content)
+        conversation_id = str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+        chunks = ingest_file(path, user_id, content, conversation_id, embeddings)
+        checkpoint.record(key, conversation_id, chunks or 0)
+        if chunks is None:
+            return "skipped", path, 0, len(content)
+        return "indexed", path, chunks, len(content)
+
+    logger.info(f"Indexing {len(jobs)} file(s) with {args.workers} worker(s)")
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(run, path, user_id): path for path, user_id in jobs}
+        for finished, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                status, _, chunks, size = future.result()
+                stats[status] += 1
+                if status == "indexed":
+                    stats["chunks"] += chunks
+                    stats["bytes"] += size
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error(f"Failed to index {path}: {e}")
+                logger.debug(traceback.format_exc())
+
+            if finished % 25 == 0 or finished == len(jobs):
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"[{finished}/{len(jobs)}] indexed={stats['indexed']} skipped={stats['skipped']} "
+                    f"failed={stats['failed']} {stats['indexed'] / elapsed:.2f} files/s "
+                    f"{stats['chunks'] / elapsed:.1f} chunks/s"
+                )
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(
+        f"Indexing of Documents Done in {elapsed:.1f}s: {stats['indexed']} indexed, "
+        f"{stats['skipped']} skipped, {stats['failed']} failed | "
+        f"{stats['indexed'] / elapsed:.2f} files/s, {stats['chunks'] / elapsed:.1f} chunks/s, "
+        f"{stats['bytes'] / elapsed / 1024 / 1024:.2f} MB/s"
+    )
+    if stats["failed"]:
+        sys.exit(1)
 
-vector_store = QdrantVectorStore.from_documents(
-    documents=split_docs,
-    url="http://vector-db:6333",
-    collection_name="learning_vectors",
-    embedding=embedding_model
-)
 
-print("Indexing of Documents Done...")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
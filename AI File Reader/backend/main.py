@@ -7,24 +7,39 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from middlewares.auth import auth
 import os
-import io
-import PyPDF2
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
 from configs.database import get_db_connection, init_db
-import openai
+from configs.vector_db import get_async_qdrant_client, get_qdrant_client, get_qdrant_url
+from services.search import search_user_documents, format_matches_as_context
+from services.retrieval import (
+    DEFAULT_K,
+    build_chat_prompt,
+    build_context,
+    build_multi_source_prompt,
+    generate_answer,
+    retrieve,
+)
+from services.ingestion import (
+    ALLOWED_EXTENSIONS,
+    add_chunks,
+    clean_text,
+    delete_chunks,
+    delete_collection,
+    diff_chunks,
+    embed_chunks,
+    get_embeddings,
+    get_file_extension,
+    index_documents,
+    insert_creation,
+    prepare_chunks,
+)
+import asyncio
 import sys
 import json
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
 import re
-from docx import Document as DocxDocument
-from pptx import Presentation
-import openpyxl
-import xlrd
+from contextlib import asynccontextmanager, suppress
 import requests
 
 logging.basicConfig(level=logging.INFO)
@@ -35,7 +50,58 @@ load_dotenv()
 if not os.getenv("OPENAI_API_KEY"):
     print("Warning: OPENAI_API_KEY is not set. Qdrant embeddings will fail.")
 
-app = FastAPI(title="AI File Reader API", version="1.0.0")
+_ai_client = None
+
+def get_ai_client():
+    """Return the Gemini chat client, created on first use."""
+    global _ai_client
+    if _ai_client is None:
+        import openai
+
+        gemini_api_key = os.getenv("GEMINI_API_KEY")
+        if not gemini_api_key:
+            print("Warning: GEMINI_API_KEY environment variable is not set")
+
+        _ai_client = openai.OpenAI(
+            api_key=gemini_api_key,
+            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
+        )
+    return _ai_client
+
+async def initialize_database(attempts=None, delay=0.5, max_delay=30.0):
+    """Run init_db with exponential backoff; retries forever when attempts is None."""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await asyncio.to_thread(init_db)
+            logger.info("Database initialized")
+            return True
+        except Exception as e:
+            logger.warning(f"Database initialization failed (attempt {attempt}): {e}")
+            if attempts is not None and attempt >= attempts:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Postgres stays off the startup path: schema initialization runs in the
+    # background and keeps retrying, so an outage never delays or blocks boot.
+    db_init_task = asyncio.create_task(initialize_database())
+
+    try:
+        get_ai_client()
+    except Exception as e:
+        logger.warning(f"AI client could not be initialized: {e}")
+
+    yield
+
+    db_init_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await db_init_task
+
+app = FastAPI(title="AI File Reader API", version="1.0.0", lifespan=lifespan)
 
 origins = [
     "https://questrion.vercel.app",
@@ -50,21 +116,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-init_db()
-
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if not gemini_api_key:
-    print("Warning: GEMINI_API_KEY environment variable is not set")
-
-AI = openai.OpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
-
 class ChatRequest(BaseModel):
     message: str
     conversationId: str
 
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 5
+
+class SearchChatRequest(BaseModel):
+    message: str
+    k: int = 5
+
 class Creation(BaseModel):
     id: str = None
     user_id: str
@@ -75,90 +138,6 @@ class Creation(BaseModel):
     created_at: str = None
 
 
-def clean_text(text: str) -> str:
-    """
-    Repair common PDF-extraction spacing artifacts while preserving real spaces.
-
-    Heuristics:
-    - Join spaces that appear *inside* words (lowercase-letter SPACE lowercase-letter),
-      but DO NOT collapse 'a lot' or 'A lot' (exclude word-boundary + 'a' cases).
-    - Keep 'New York' (right side uppercase not merged).
-    - Normalize spaces around hyphens and punctuation.
-    - Collapse excessive spaces while preserving newlines.
-    """
-    if not text:
-        return text
-
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-
-    text = re.sub(r'(?<=\w)-\s*\n\s*(?=\w)', '-', text)
-
-    text = re.sub(r'(?<!\b[aA])(?<=[a-z])\s+(?=[a-z])', '', text)
-
-    text = re.sub(r'(?<=\w)\s*-\s*(?=\w)', '-', text)
-
-    text = re.sub(r'([.,;:!?])(?=\S)', r'\1 ', text)
-
-    text = re.sub(r'[ \t]{2,}', ' ', text)
-
-    return text
-
-
-def extract_text_from_file(file_content: bytes, filename: str) -> str:
-    """Extract text from various file formats"""
-    file_ext = filename.lower().split('.')[-1]
-
-    if file_ext == 'pdf':
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-        return text
-
-    elif file_ext in ['docx']:
-        doc = DocxDocument(io.BytesIO(file_content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-
-    elif file_ext in ['pptx']:
-        prs = Presentation(io.BytesIO(file_content))
-        text = ""
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    text += shape.text + "\n"
-        return text
-
-    elif file_ext in ['xlsx']:
-        workbook = openpyxl.load_workbook(io.BytesIO(file_content))
-        text = ""
-        for sheet_name in workbook.sheetnames:
-            sheet = workbook[sheet_name]
-            for row in sheet.iter_rows(values_only=True):
-                row_text = " ".join([str(cell) for cell in row if cell is not None])
-                if row_text.strip():
-                    text += row_text + "\n"
-        return text
-
-    elif file_ext in ['xls']:
-        workbook = xlrd.open_workbook(file_contents=file_content)
-        text = ""
-        for sheet_idx in range(workbook.nsheets):
-            sheet = workbook.sheet_by_index(sheet_idx)
-            for row_idx in range(sheet.nrows):
-                row_text = " ".join([str(sheet.cell_value(row_idx, col_idx)) for col_idx in range(sheet.ncols)])
-                if row_text.strip():
-                    text += row_text + "\n"
-        return text
-
-    elif file_ext in ['txt', 'md']:
-        return file_content.decode('utf-8', errors='ignore')
-
-    else:
-        raise ValueError(f"Unsupported file format: {file_ext}")
-
 @app.get("/")
 async def root():
     return {"message": "Server is Live!"}
@@ -172,61 +151,26 @@ async def upload_file(
     try:
         logger.info(f"Processing file upload for user: {user_id}")
 
-        allowed_extensions = ['pdf', 'docx', 'pptx', 'xlsx', 'xls', 'txt', 'md']
-        file_ext = file.filename.lower().split('.')[-1]
-        if file_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File type not supported. Allowed types: {', '.join(allowed_extensions)}"
-            )
-
         content = await file.read()
         await file.seek(0)
-        if len(content) > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File size exceeds allowed size (10MB)")
 
         try:
-            file_text = extract_text_from_file(content, file.filename)
-            logger.info(f"[PDF Extraction] Length of extracted text: {len(file_text)}")
-            logger.info(f"[PDF Extraction] First 500 chars:\n{file_text[:500]}")
+            safe_text, split_docs = prepare_chunks(content, file.filename)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-            if not file_text.strip():
-                raise HTTPException(status_code=400, detail="Could not extract text from file.")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
+        if not os.getenv("OPENAI_API_KEY"):
+            raise HTTPException(status_code=500, detail="OPENAI_API_KEY is required for embeddings")
 
-        safe_text = clean_text(file_text.replace('\x00', ''))
+        for i, doc in enumerate(split_docs):
+            logger.info(f"[Chunk {i}] length={len(doc.page_content)}")
+            logger.info(f"[Chunk {i}] snippet={doc.page_content[:200]}")
 
-        if not safe_text.strip():
-             raise HTTPException(status_code=400, detail="File has no extractable text")
         new_id = str(uuid.uuid4())
-
         collection_name = f"file_{new_id}"
         try:
-            if not os.getenv("OPENAI_API_KEY"):
-                raise HTTPException(status_code=500, detail="OPENAI_API_KEY is required for embeddings")
-
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=400)
-            docs = [Document(page_content=safe_text)]
-            split_docs = text_splitter.split_documents(docs)
-
-            for i, doc in enumerate(split_docs):
-                logger.info(f"[Chunk {i}] length={len(doc.page_content)}")
-                logger.info(f"[Chunk {i}] snippet={doc.page_content[:200]}")
-
-            if not split_docs or not any(doc.page_content.strip() for doc in split_docs):
-                raise HTTPException(status_code=400, detail="No meaningful content found in file for indexing")
-
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-            QdrantVectorStore.from_documents(
-                documents=split_docs,
-                url="http://vector-db:6333",
-                collection_name=collection_name,
-                embedding=embeddings
-            )
+            index_documents(split_docs, collection_name)
             logger.info(f"Successfully indexed {len(split_docs)} chunks into Qdrant collection {collection_name}")
-        except HTTPException:
-            raise
         except Exception as e:
             logger.error(f"Vector indexing failed: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to create vector index: {str(e)}")
@@ -235,26 +179,13 @@ async def upload_file(
         cur = conn.cursor()
         try:
             logger.info(f"Inserting creation with id={new_id}, user_id={user_id}")
-            cur.execute("""
-                INSERT INTO creations (id, user_id, prompt, content, type, pdf_content, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                RETURNING id
-            """, (
-                new_id,
-                user_id,
-                file.filename,
-                '',
-                'file',
-                safe_text
-            ))
-            creation_id = cur.fetchone()['id']
+            insert_creation(cur, new_id, user_id, file.filename, safe_text)
             conn.commit()
         except Exception as e:
             logger.error(f"DB insert error: {e}")
             logger.error(traceback.format_exc())
             try:
-                delete_url = f"http://vector-db:6333/collections/{collection_name}"
-                requests.delete(delete_url)
+                delete_collection(collection_name)
             except Exception:
                 pass
             raise HTTPException(status_code=500, detail="Failed to save file information")
@@ -285,6 +216,118 @@ async def upload_pdf(
 ):
     return await upload_file(request, pdf, user_id)
 
+@app.put("/api/ai/upload/{conversation_id}")
+async def update_file(
+    conversation_id: str,
+    file: UploadFile = File(...),
+    user_id: str = Depends(auth)
+):
+    try:
+        logger.info(f"Processing file update for user: {user_id}, conversation: {conversation_id}")
+
+        content = await file.read()
+
+        try:
+            safe_text, split_docs = prepare_chunks(content, file.filename)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if not os.getenv("OPENAI_API_KEY"):
+            raise HTTPException(status_code=500, detail="OPENAI_API_KEY is required for embeddings")
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT prompt FROM creations
+                WHERE id = %s AND user_id = %s
+            """, (conversation_id, user_id))
+            creation = cur.fetchone()
+        finally:
+            cur.close()
+            conn.close()
+        if not creation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        original_ext = get_file_extension(creation['prompt'] or '')
+        if original_ext in ALLOWED_EXTENSIONS and get_file_extension(file.filename) != original_ext:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type does not match the original file (.{original_ext})"
+            )
+
+        collection_name = f"file_{conversation_id}"
+        client = get_qdrant_client()
+        embeddings = get_embeddings()
+
+        # Embed the new chunks before taking the row lock, so neither the lock nor the
+        # event loop waits on the embedding API.
+        try:
+            new_docs, _, _ = await asyncio.to_thread(diff_chunks, client, collection_name, split_docs)
+            vectors = await asyncio.to_thread(embed_chunks, new_docs, embeddings)
+        except Exception as e:
+            logger.error(f"Vector index update failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to update vector index: {str(e)}")
+
+        conn = get_db_connection()
+        cur = conn.cursor()
+        try:
+            # Lock the row so concurrent updates of the same file apply one after another.
+            # The diff is recomputed under the lock; only chunks another update removed
+            # in the meantime still need embedding here.
+            cur.execute("""
+                SELECT id FROM creations
+                WHERE id = %s AND user_id = %s
+                FOR UPDATE
+            """, (conversation_id, user_id))
+            if not cur.fetchone():
+                raise HTTPException(status_code=404, detail="Conversation not found")
+
+            try:
+                new_docs, stale_ids, unchanged = await asyncio.to_thread(diff_chunks, client, collection_name, split_docs)
+                await asyncio.to_thread(add_chunks, client, collection_name, new_docs, embeddings, vectors)
+            except Exception as e:
+                logger.error(f"Vector index update failed: {e}")
+                raise HTTPException(status_code=500, detail=f"Failed to update vector index: {str(e)}")
+
+            cur.execute("""
+                UPDATE creations SET pdf_content = %s, prompt = %s
+                WHERE id = %s AND user_id = %s
+            """, (safe_text, file.filename, conversation_id, user_id))
+
+            # Stale chunks are removed only once the new ones are in place; if anything
+            # fails from here the update can simply be retried, as the diff is recomputed
+            # against whatever the collection holds.
+            await asyncio.to_thread(delete_chunks, client, collection_name, stale_ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+        logger.info(
+            f"Updated {collection_name}: added={len(new_docs)} removed={len(stale_ids)} unchanged={unchanged}"
+        )
+
+        return JSONResponse(content={
+            "success": True,
+            "conversationId": conversation_id,
+            "added": len(new_docs),
+            "removed": len(stale_ids),
+            "unchanged": unchanged,
+            "fileText": safe_text,
+            "extractedText": safe_text,
+            "pdfText": safe_text
+        })
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in /api/ai/upload/{conversation_id}: {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/ai/chat")
 async def chat_with_file(request: ChatRequest, user_id: str = Depends(auth)):
     try:
@@ -313,13 +356,15 @@ async def chat_with_file(request: ChatRequest, user_id: str = Depends(auth)):
             if not os.getenv("OPENAI_API_KEY"):
                 raise Exception("OPENAI_API_KEY is required for embeddings")
 
-            embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+            from langchain_qdrant import QdrantVectorStore
+
+            embeddings = get_embeddings()
             vector_store = None
             last_error = None
 
             collection_name = f"file_{request.conversationId}"
             vector_store = QdrantVectorStore.from_existing_collection(
-                url="http://vector-db:6333",
+                url=get_qdrant_url(),
                 collection_name=collection_name,
                 embedding=embeddings
             )
@@ -332,7 +377,7 @@ async def chat_with_file(request: ChatRequest, user_id: str = Depends(auth)):
                     detail="Vector index missing or unreachable. Please re-upload the file."
                 )
 
-        matches = vector_store.similarity_search(query=request.message, k=5)
+        matches = retrieve(vector_store, request.message, k=DEFAULT_K)
 
         if not matches:
             raise HTTPException(
@@ -343,33 +388,15 @@ async def chat_with_file(request: ChatRequest, user_id: str = Depends(auth)):
             logger.info(f"[Retrieved Chunk {i}] length={len(doc.page_content)}")
             logger.info(f"[Retrieved Chunk {i}] snippet={doc.page_content[:200]}")
 
-        retrieved_context = "\n\n".join(doc.page_content for doc in matches)
-        retrieved_context = clean_text(retrieved_context)
+        retrieved_context = build_context(matches)
 
         print("🔍 Retrieved Context Chunks:", retrieved_context)
         print("📝 Final Prompt Sent to LLM:", f"Use the following context:\n\n{retrieved_context}")
 
-        SYSTEM_PROMPT = f"""
-            You are a helpful AI Assistant who answers user queries based only on the retrieved context.
-
-            Context:
-            {retrieved_context}
-
-            User Question: {request.message}
-
-            Answer concisely and cite only from the context and give the page number of the answer if the file contains page number.
-        """
+        SYSTEM_PROMPT = build_chat_prompt(retrieved_context, request.message)
 
         try:
-            response = AI.chat.completions.create(
-                model="gemini-2.0-flash",
-                messages=[{"role": "user", "content": SYSTEM_PROMPT}],
-                temperature=0.7,
-                max_tokens=1000,
-            )
-            if not response.choices or not hasattr(response.choices[0], 'message'):
-                raise Exception("Invalid response from AI API")
-            ai_content = response.choices[0].message.content
+            ai_content = generate_answer(get_ai_client(), SYSTEM_PROMPT)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error calling AI API: {str(e)}")
 
@@ -396,6 +423,89 @@ async def chat_with_file(request: ChatRequest, user_id: str = Depends(auth)):
         logger.error(f"Error in /api/ai/chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def search_all_user_files(user_id: str, query: str, k: int):
+    """Embed the query once and search every file index the user owns."""
+    if not os.getenv("OPENAI_API_KEY"):
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY is required for embeddings")
+
+    k = max(1, min(k, 50))
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, prompt FROM creations
+            WHERE user_id = %s AND type = 'file'
+        """, (user_id,))
+        documents = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+
+    if not documents:
+        return {"matches": [], "searched": 0, "timedOut": [], "failed": [], "partial": False}
+
+    embeddings = get_embeddings()
+    query_vector = await asyncio.to_thread(embeddings.embed_query, query)
+
+    return await search_user_documents(
+        get_async_qdrant_client(),
+        query_vector,
+        documents,
+        k=k,
+    )
+
+@app.post("/api/ai/search")
+async def search_files(request: SearchRequest, user_id: str = Depends(auth)):
+    try:
+        logger.info(f"Processing cross-document search for user: {user_id}")
+        result = await search_all_user_files(user_id, request.query, request.k)
+        return JSONResponse(content=jsonable_encoder({"success": True, **result}))
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in /api/ai/search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/ai/search/chat")
+async def chat_with_all_files(request: SearchChatRequest, user_id: str = Depends(auth)):
+    try:
+        logger.info(f"Processing cross-document chat for user: {user_id}")
+        result = await search_all_user_files(user_id, request.message, request.k)
+        matches = result["matches"]
+
+        if not matches:
+            raise HTTPException(status_code=404, detail="No relevant content found in your files")
+
+        # Chunks are cleaned at ingestion; cleaning again would mangle the source labels
+        retrieved_context = format_matches_as_context(matches)
+
+        SYSTEM_PROMPT = build_multi_source_prompt(retrieved_context, request.message)
+
+        try:
+            ai_content = generate_answer(get_ai_client(), SYSTEM_PROMPT)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error calling AI API: {str(e)}")
+
+        sources = []
+        for match in matches:
+            source = {"conversationId": match["conversationId"], "source": match["source"]}
+            if source not in sources:
+                sources.append(source)
+
+        return JSONResponse(content=jsonable_encoder({
+            "success": True,
+            "content": ai_content,
+            "sources": sources,
+            "partial": result["partial"]
+        }))
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in /api/ai/search/chat: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/user/get-user-creations")
 async def get_user_creations(
     request: Request,
@@ -465,7 +575,7 @@ async def delete_creation(
             conn.commit()
 
             try:
-                qdrant_url = "http://vector-db:6333"
+                qdrant_url = get_qdrant_url()
                 collection_name = f"file_{creation_id}"
                 delete_url = f"{qdrant_url}/collections/{collection_name}"
                 response = requests.delete(delete_url)
@@ -536,7 +646,7 @@ async def get_suggestions(conversationId: str, user_id: str = Depends(auth)):
                     """
 
         try:
-            response = AI.chat.completions.create(
+            response = get_ai_client().chat.completions.create(
                 model="gemini-2.0-flash",
                 messages=[
                     {"role": "system", "content": system_prompt},
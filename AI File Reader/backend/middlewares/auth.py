@@ -1,6 +1,5 @@
 from fastapi import Request, Depends, HTTPException
 from fastapi_clerk_auth import ClerkConfig, ClerkHTTPBearer, HTTPAuthorizationCredentials
-from clerk_backend_api import Clerk
 import os
 from dotenv import load_dotenv
 
@@ -12,7 +11,16 @@ clerk_config = ClerkConfig(
 
 clerk_auth_guard = ClerkHTTPBearer(config=clerk_config)
 
-clerk_client = Clerk(os.getenv("CLERK_SECRET_KEY"))
+_clerk_client = None
+
+def get_clerk_client():
+    """Return the Clerk backend client, created on first use rather than at import."""
+    global _clerk_client
+    if _clerk_client is None:
+        from clerk_backend_api import Clerk
+        _clerk_client = Clerk(os.getenv("CLERK_SECRET_KEY"))
+    return _clerk_client
+
 async def auth(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(clerk_auth_guard)
@@ -0,0 +1,336 @@
+import hashlib
+import io
+import logging
+import re
+import uuid
+import requests
+from configs.vector_db import get_qdrant_url
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = ['pdf', 'docx', 'pptx', 'xlsx', 'xls', 'txt', 'md']
+MAX_FILE_SIZE = 10 * 1024 * 1024
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 400
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+
+def clean_text(text: str) -> str:
+    """
+    Repair common PDF-extraction spacing artifacts while preserving real spaces.
+
+    Heuristics:
+    - Join spaces that appear *inside* words (lowercase-letter SPACE lowercase-letter),
+      but DO NOT collapse 'a lot' or 'A lot' (exclude word-boundary + 'a' cases).
+    - Keep 'New York' (right side uppercase not merged).
+    - Normalize spaces around hyphens and punctuation.
+    - Collapse excessive spaces while preserving newlines.
+    """
+    if not text:
+        return text
+
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    text = re.sub(r'(?<=\w)-\s*\n\s*(?=\w)', '-', text)
+
+    text = re.sub(r'(?<!\b[aA])(?<=[a-z])\s+(?=[a-z])', '', text)
+
+    text = re.sub(r'(?<=\w)\s*-\s*(?=\w)', '-', text)
+
+    text = re.sub(r'([.,;:!?])(?=\S)', r'\1 ', text)
+
+    text = re.sub(r'[ \t]{2,}', ' ', text)
+
+    return text
+
+
+# Parsers and langchain are imported inside the functions that use them, so that
+# importing this module (and main.py) stays cheap and each format library is only
+# loaded the first time a file of that type is processed.
+
+def _extract_pdf(file_content: bytes) -> str:
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    text = ""
+    for page in pdf_reader.pages:
+        text += page.extract_text() or ""
+    return text
+
+
+def _extract_docx(file_content: bytes) -> str:
+    from docx import Document as DocxDocument
+
+    doc = DocxDocument(io.BytesIO(file_content))
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+
+def _extract_pptx(file_content: bytes) -> str:
+    from pptx import Presentation
+
+    prs = Presentation(io.BytesIO(file_content))
+    text = ""
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text"):
+                text += shape.text + "\n"
+    return text
+
+
+def _extract_xlsx(file_content: bytes) -> str:
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(io.BytesIO(file_content))
+    text = ""
+    for sheet_name in workbook.sheetnames:
+        sheet = workbook[sheet_name]
+        for row in sheet.iter_rows(values_only=True):
+            row_text = " ".join([str(cell) for cell in row if cell is not None])
+            if row_text.strip():
+                text += row_text + "\n"
+    return text
+
+
+def _extract_xls(file_content: bytes) -> str:
+    import xlrd
+
+    workbook = xlrd.open_workbook(file_contents=file_content)
+    text = ""
+    for sheet_idx in range(workbook.nsheets):
+        sheet = workbook.sheet_by_index(sheet_idx)
+        for row_idx in range(sheet.nrows):
+            row_text = " ".join([str(sheet.cell_value(row_idx, col_idx)) for col_idx in range(sheet.ncols)])
+            if row_text.strip():
+                text += row_text + "\n"
+    return text
+
+
+def _extract_plain_text(file_content: bytes) -> str:
+    return file_content.decode('utf-8', errors='ignore')
+
+
+EXTRACTORS = {
+    'pdf': _extract_pdf,
+    'docx': _extract_docx,
+    'pptx': _extract_pptx,
+    'xlsx': _extract_xlsx,
+    'xls': _extract_xls,
+    'txt': _extract_plain_text,
+    'md': _extract_plain_text,
+}
+
+
+def extract_text_from_file(file_content: bytes, filename: str) -> str:
+    """Extract text from various file formats"""
+    file_ext = filename.lower().split('.')[-1]
+
+    extractor = EXTRACTORS.get(file_ext)
+    if extractor is None:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+    return extractor(file_content)
+
+
+def get_file_extension(filename: str) -> str:
+    return filename.lower().split('.')[-1]
+
+
+def prepare_text(file_content: bytes, filename: str) -> str:
+    """Extract and clean the text of a file exactly as it is stored in `creations.pdf_content`."""
+    file_text = extract_text_from_file(file_content, filename)
+    logger.info(f"[PDF Extraction] Length of extracted text: {len(file_text)}")
+    logger.info(f"[PDF Extraction] First 500 chars:\n{file_text[:500]}")
+
+    if not file_text.strip():
+        raise ValueError("Could not extract text from file.")
+
+    return clean_text(file_text.replace('\x00', ''))
+
+
+def prepare_chunks(file_content: bytes, filename: str):
+    """
+    Validate a file and turn it into (cleaned text, chunks) for indexing.
+
+    Raises ValueError with a message suitable for returning to the user.
+    """
+    if get_file_extension(filename) not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"File type not supported. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}")
+
+    if len(file_content) > MAX_FILE_SIZE:
+        raise ValueError("File size exceeds allowed size (10MB)")
+
+    try:
+        safe_text = prepare_text(file_content, filename)
+    except Exception as e:
+        raise ValueError(f"Error processing file: {str(e)}") from e
+
+    if not safe_text.strip():
+        raise ValueError("File has no extractable text")
+
+    split_docs = split_text(safe_text)
+    if not split_docs or not any(doc.page_content.strip() for doc in split_docs):
+        raise ValueError("No meaningful content found in file for indexing")
+
+    return safe_text, split_docs
+
+
+def split_text(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    """Split cleaned text into the chunks that get embedded for a file."""
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents([Document(page_content=text)])
+
+
+def get_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+
+def index_documents(split_docs, collection_name: str, embedding=None, url: str = None, **client_options):
+    """
+    Embed chunks and store them in a new Qdrant collection.
+
+    `client_options` are passed to the Qdrant client, e.g. `location=":memory:"` for offline runs.
+    """
+    from langchain_qdrant import QdrantVectorStore
+
+    if "location" not in client_options:
+        client_options["url"] = url or get_qdrant_url()
+    return QdrantVectorStore.from_documents(
+        documents=split_docs,
+        collection_name=collection_name,
+        embedding=embedding or get_embeddings(),
+        **client_options
+    )
+
+
+def delete_collection(collection_name: str, url: str = None):
+    delete_url = f"{url or get_qdrant_url()}/collections/{collection_name}"
+    return requests.delete(delete_url)
+
+
+def insert_creation(cur, creation_id: str, user_id: str, filename: str, text: str):
+    """Register an indexed file in `creations` so it shows up in the app."""
+    cur.execute("""
+        INSERT INTO creations (id, user_id, prompt, content, type, pdf_content, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        RETURNING id
+    """, (
+        creation_id,
+        user_id,
+        filename,
+        '',
+        'file',
+        text
+    ))
+    return cur.fetchone()['id']
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(digest: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, digest))
+
+
+def diff_chunks(client, collection_name: str, split_docs):
+    """
+    Compare freshly split chunks against the chunks stored in a collection.
+
+    Returns (new_docs, stale_ids, unchanged) where `new_docs` maps chunk hash to the
+    Document that still has to be embedded and `stale_ids` are the point ids whose
+    content no longer appears in the file, plus extra copies of a chunk stored more
+    than once. A missing collection counts as empty.
+    """
+    wanted = {}
+    for doc in split_docs:
+        wanted.setdefault(chunk_hash(doc.page_content), doc)
+
+    stored = {}
+    offset = None
+    while client.collection_exists(collection_name):
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=256,
+            offset=offset,
+            with_payload=["page_content"],
+            with_vectors=False,
+        )
+        for point in points:
+            stored.setdefault(chunk_hash((point.payload or {}).get("page_content", "")), []).append(str(point.id))
+        if offset is None:
+            break
+
+    new_docs = {h: doc for h, doc in wanted.items() if h not in stored}
+    stale_ids = []
+    for h, ids in stored.items():
+        if h not in wanted:
+            stale_ids.extend(ids)
+            continue
+        # Keep a single copy, preferring the id add_chunks would write for this chunk
+        keep = chunk_point_id(h) if chunk_point_id(h) in ids else ids[0]
+        stale_ids.extend(point_id for point_id in ids if point_id != keep)
+    unchanged = len(wanted) - len(new_docs)
+    return new_docs, stale_ids, unchanged
+
+
+def embed_chunks(new_docs, embedding=None):
+    """Embed chunks ahead of add_chunks; returns {chunk hash: vector}."""
+    if not new_docs:
+        return {}
+    embedding = embedding or get_embeddings()
+    vectors = embedding.embed_documents([doc.page_content for doc in new_docs.values()])
+    return dict(zip(new_docs, vectors))
+
+
+def add_chunks(client, collection_name: str, new_docs, embedding=None, vectors=None, batch_size=64):
+    """
+    Upsert chunks keyed by their hash, so retrying an update is idempotent.
+
+    `vectors` are embeddings from embed_chunks; chunks without one are embedded here.
+    The collection is created when it does not exist yet.
+    """
+    if not new_docs:
+        return []
+    from qdrant_client import models
+
+    vectors = dict(vectors or {})
+    vectors.update(embed_chunks({h: doc for h, doc in new_docs.items() if h not in vectors}, embedding))
+
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(
+                size=len(next(iter(vectors.values()))),
+                distance=models.Distance.COSINE,
+            ),
+        )
+
+    points = [
+        models.PointStruct(
+            id=chunk_point_id(h),
+            vector=vectors[h],
+            payload={"page_content": doc.page_content, "metadata": doc.metadata},
+        )
+        for h, doc in new_docs.items()
+    ]
+    for i in range(0, len(points), batch_size):
+        client.upsert(collection_name=collection_name, points=points[i:i + batch_size])
+    return [point.id for point in points]
+
+
+def delete_chunks(client, collection_name: str, point_ids):
+    if not point_ids:
+        return
+    from qdrant_client import models
+
+    client.delete(
+        collection_name=collection_name,
+        points_selector=models.PointIdsList(points=list(point_ids)),
+    )
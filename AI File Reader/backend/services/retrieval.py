@@ -0,0 +1,63 @@
+import logging
+from services.ingestion import clean_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_K = 5
+CHAT_MODEL = "gemini-2.0-flash"
+
+
+def embed_query(vector_store, query: str):
+    return vector_store.embeddings.embed_query(query)
+
+
+def search(vector_store, query_vector, k: int = DEFAULT_K):
+    return vector_store.similarity_search_by_vector(query_vector, k=k)
+
+
+def retrieve(vector_store, query: str, k: int = DEFAULT_K):
+    """Return the k chunks of a file index closest to the query."""
+    return search(vector_store, embed_query(vector_store, query), k=k)
+
+
+def build_context(matches) -> str:
+    return clean_text("\n\n".join(doc.page_content for doc in matches))
+
+
+def build_chat_prompt(retrieved_context: str, question: str) -> str:
+    return f"""
+            You are a helpful AI Assistant who answers user queries based only on the retrieved context.
+
+            Context:
+            {retrieved_context}
+
+            User Question: {question}
+
+            Answer concisely and cite only from the context and give the page number of the answer if the file contains page number.
+        """
+
+
+def build_multi_source_prompt(retrieved_context: str, question: str) -> str:
+    return f"""
+            You are a helpful AI Assistant who answers user queries based only on the retrieved context.
+            The context comes from several files; each chunk is labelled with its source file.
+
+            Context:
+            {retrieved_context}
+
+            User Question: {question}
+
+            Answer concisely, cite only from the context and name the source file(s) the answer comes from.
+        """
+
+
+def generate_answer(ai_client, prompt: str) -> str:
+    response = ai_client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+        max_tokens=1000,
+    )
+    if not response.choices or not hasattr(response.choices[0], 'message'):
+        raise Exception("Invalid response from AI API")
+    return response.choices[0].message.content
@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_TIMEOUT = 2.0
+DEFAULT_DEADLINE = 3.0
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+async def _search_collection(client, collection_name, query_vector, k, timeout, semaphore):
+    async with semaphore:
+        response = await asyncio.wait_for(
+            client.query_points(
+                collection_name=collection_name,
+                query=query_vector,
+                limit=k,
+                with_payload=True,
+            ),
+            timeout=timeout,
+        )
+    return response.points
+
+
+async def search_user_documents(
+    client,
+    query_vector,
+    documents,
+    k=5,
+    index_timeout=DEFAULT_INDEX_TIMEOUT,
+    max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    deadline=DEFAULT_DEADLINE,
+):
+    """
+    Query every document index of a user in parallel and merge the hits into one global top-k.
+
+    `documents` is a list of dicts with `id` (the conversation id) and `prompt` (the file name),
+    as stored in `creations`. All collections are built with the same embedding model and
+    cosine distance, so their scores are directly comparable.
+
+    Indexes that exceed `index_timeout` seconds or fail are skipped and reported, so a
+    slow or missing collection only shrinks the result set instead of failing the query.
+    `deadline` bounds the whole fan-out: indexes still queued or running when it expires
+    are cancelled and reported as timed out.
+    """
+    if not documents:
+        return {"matches": [], "searched": 0, "timedOut": [], "failed": [], "partial": False}
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    started = time.perf_counter()
+
+    tasks = [
+        asyncio.create_task(
+            _search_collection(client, f"file_{doc['id']}", query_vector, k, index_timeout, semaphore)
+        )
+        for doc in documents
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(asyncio.TimeoutError())
+        else:
+            results.append(task.exception() or task.result())
+
+    timed_out = []
+    failed = []
+    candidates = []
+    for doc, result in zip(documents, results):
+        if isinstance(result, asyncio.TimeoutError):
+            timed_out.append(doc['id'])
+            continue
+        if isinstance(result, Exception):
+            logger.warning(f"Search failed for collection file_{doc['id']}: {result}")
+            failed.append(doc['id'])
+            continue
+        for point in result:
+            payload = point.payload or {}
+            candidates.append({
+                "conversationId": doc['id'],
+                "source": doc.get('prompt'),
+                "content": payload.get("page_content", ""),
+                "metadata": payload.get("metadata") or {},
+                "score": point.score,
+            })
+
+    matches = heapq.nlargest(k, candidates, key=lambda match: match["score"])
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"[Search] indexes={len(documents)} candidates={len(candidates)} "
+        f"timed_out={len(timed_out)} failed={len(failed)} took={elapsed_ms:.1f}ms"
+    )
+
+    return {
+        "matches": matches,
+        "searched": len(documents) - len(timed_out) - len(failed),
+        "timedOut": timed_out,
+        "failed": failed,
+        "partial": bool(timed_out or failed),
+    }
+
+
+def format_matches_as_context(matches):
+    """Render merged matches as prompt context, labelling each chunk with its source file."""
+    return "\n\n".join(
+        f"[Source {i + 1}: {match['source'] or match['conversationId']}]\n{match['content']}"
+        for i, match in enumerate(matches)
+    )
@@ -1,5 +1,5 @@
 import uvicorn
-from main import app
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=5000, reload=True) 
\ No newline at end of file
+    # reload needs the app as an import string so the reloader can re-import it
+    uvicorn.run("main:app", host="0.0.0.0", port=5000, reload=True)